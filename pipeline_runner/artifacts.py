@@ -5,7 +5,6 @@ import tarfile
 from tarfile import TarInfo
 from time import time as ts
 from typing import List
-from uuid import UUID
 
 from . import utils
 from .config import config
@@ -15,7 +14,7 @@ logger = logging.getLogger(__name__)
 
 
 class ArtifactManager:
-    def __init__(self, container: ContainerRunner, artifact_directory: str, step_uuid: UUID):
+    def __init__(self, container: ContainerRunner, artifact_directory: str, step_uuid: str):
         self._container = container
         self._artifact_directory = artifact_directory
         self._step_uuid = step_uuid
@@ -1,8 +1,23 @@
+import hashlib
 import logging
 import os.path
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tempfile import NamedTemporaryFile
 from time import time as ts
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
+
+# Optional, installed via the 'io_uring' extra. The backend is written
+# against the liburing 2022.x API; other versions are not supported.
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 from . import utils
 from .config import config
@@ -12,6 +27,12 @@ logger = logging.getLogger(__name__)
 
 DOCKER_IMAGES_ARCHIVE_FILE_NAME = "images.tar"
 
+IO_URING_QUEUE_DEPTH = 64
+IO_URING_BATCH_SIZE = 16
+WRITEV_BATCH_SIZE = 16
+
+ZSTD_ARCHIVE_SUFFIX = ".zst"
+
 
 class CacheManager:
     def __init__(self, container: ContainerRunner, cache_directory: str, cache_definitions: Dict[str, str]):
@@ -22,14 +43,49 @@ class CacheManager:
         self._ignored_caches = {"docker"}
 
     def upload(self, cache_names: List[str]):
-        for name in cache_names:
-            cu = CacheRestoreFactory.get(self._container, self._cache_directory, self._cache_definitions, name)
-            cu.restore()
+        restores = [
+            CacheRestoreFactory.get(self._container, self._cache_directory, self._cache_definitions, name)
+            for name in cache_names
+        ]
+
+        self._prepare_remote_directories(restores)
+        self._run_concurrently(r.restore for r in restores)
 
     def download(self, cache_names: List[str]):
-        for name in cache_names:
-            cd = CacheSaveFactory.get(self._container, self._cache_directory, self._cache_definitions, name)
-            cd.save()
+        saves = [
+            CacheSaveFactory.get(self._container, self._cache_directory, self._cache_definitions, name)
+            for name in cache_names
+        ]
+
+        self._run_concurrently(s.save for s in saves)
+
+    def _prepare_remote_directories(self, restores: List["CacheRestore"]):
+        # One exec prepares the target directories for all caches at once
+        # instead of paying a docker exec round-trip per cache.
+        prepare_cmds = [cmd for cmd in (r.get_prepare_command() for r in restores) if cmd]
+
+        if not prepare_cmds:
+            return
+
+        exit_code, output = self._container.run_command(" && ".join(prepare_cmds))
+        if exit_code != 0:
+            logger.error("Remote command failed: %s", output.decode())
+            raise Exception("Error preparing remote cache directories")
+
+    @staticmethod
+    def _run_concurrently(tasks):
+        tasks = list(tasks)
+
+        if len(tasks) <= 1:
+            for task in tasks:
+                task()
+            return
+
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = [executor.submit(t) for t in tasks]
+
+            for f in as_completed(futures):
+                f.result()
 
 
 class CacheRestore:
@@ -48,44 +104,92 @@ class CacheRestore:
             logger.info("Cache '%s': Not found: Skipping", self._cache_name)
             return
 
+        # The skip only makes sense against a reused container: a fresh one
+        # starts empty, so the remote can never already hold the content.
+        cache_hash = file_sha256(cache_file) if config.reuse_containers else None
+
+        if cache_hash and self._remote_cache_matches(cache_hash):
+            logger.info("Cache '%s': Content unchanged on remote: Skipping upload", self._cache_name)
+            return
+
         self._upload_cache(cache_file)
         self._restore_cache()
 
-    def _get_local_cache_file(self):
-        local_cache_archive_path = get_local_cache_archive_path(self._cache_directory, self._cache_name)
-        if not os.path.exists(local_cache_archive_path):
-            return None
+        if cache_hash:
+            self._write_remote_hash_marker(cache_hash)
 
-        return local_cache_archive_path
+    def get_prepare_command(self) -> Optional[str]:
+        if not self._get_local_cache_file():
+            return None
 
-    def _upload_cache(self, cache_file):
         remote_cache_directory = get_remote_temp_directory(self._cache_name)
         remote_cache_parent_directory = os.path.dirname(remote_cache_directory)
 
-        cache_archive_size = os.path.getsize(cache_file)
+        return f'rm -rf "{remote_cache_directory}" && mkdir -p "{remote_cache_parent_directory}"'
+
+    def _get_local_cache_file(self):
+        candidates = []
+
+        if zstandard is not None:
+            candidates.append(get_local_cache_archive_compressed_path(self._cache_directory, self._cache_name))
+
+        candidates.append(get_local_cache_archive_path(self._cache_directory, self._cache_name))
+
+        for path in candidates:
+            try:
+                os.stat(path)
+            except OSError:
+                continue
+
+            return path
+
+        return None
+
+    def _remote_cache_matches(self, cache_hash: str) -> bool:
+        marker_path = get_remote_hash_marker_path(self._cache_name)
+        target_dir = sanitize_remote_path(self._cache_definitions[self._cache_name])
+
+        # The existence check on the target matters for caches with a relative
+        # target: those live under the build directory, which is wiped when a
+        # container is returned to the pool, so the marker alone could lie.
+
+        exit_code, output = self._container.run_command(f'[ -e "{target_dir}" ] && cat "{marker_path}"')
+        if exit_code != 0:
+            return False
+
+        return output.decode().strip() == cache_hash
+
+    def _write_remote_hash_marker(self, cache_hash: str):
+        marker_path = get_remote_hash_marker_path(self._cache_name)
+
+        exit_code, output = self._container.run_command(f'echo "{cache_hash}" > "{marker_path}"')
+        if exit_code != 0:
+            logger.warning("Cache '%s': Unable to record content hash: %s", self._cache_name, output.decode())
+
+    def _upload_cache(self, cache_file):
+        remote_cache_parent_directory = os.path.dirname(get_remote_temp_directory(self._cache_name))
 
         logger.info("Cache '%s': Uploading", self._cache_name)
 
         t = ts()
 
-        prepare_cache_dir_cmd = (
-            f'[ -d "{remote_cache_directory}" ] && rm -rf "{remote_cache_directory}"; '
-            f'mkdir -p "{remote_cache_parent_directory}"'
-        )
-        res, output = self._container.run_command(prepare_cache_dir_cmd)
-        if res != 0:
-            logger.error("Remote command failed: %s", output.decode())
-            raise Exception(f"Error uploading cache: {self._cache_name}")
-
         with open(cache_file, "rb") as f:
-            success = self._container.put_archive(remote_cache_parent_directory, f)
+            if cache_file.endswith(ZSTD_ARCHIVE_SUFFIX):
+                # The daemon always receives a plain tar; the archive is
+                # decompressed on the fly as it streams out.
+                fileobj = zstandard.ZstdDecompressor().stream_reader(f)
+            else:
+                fileobj = f
+
+            stream = CountingFileStream(fileobj)
+            success = self._container.put_archive(remote_cache_parent_directory, iter(stream))
             if not success:
                 raise Exception(f"Error uploading cache: {self._cache_name}")
 
         t = ts() - t
 
         logger.info(
-            "Cache '%s': Uploaded %s in %.3fs", self._cache_name, utils.get_human_readable_size(cache_archive_size), t
+            "Cache '%s': Uploaded %s in %.3fs", self._cache_name, utils.get_human_readable_size(stream.size), t
         )
 
     def _restore_cache(self):
@@ -115,6 +219,9 @@ class NullCacheRestore(CacheRestore):
     def restore(self):
         logger.info("Cache '%s': Ignoring", self._cache_name)
 
+    def get_prepare_command(self) -> Optional[str]:
+        return None
+
 
 class CacheRestoreFactory:
     @staticmethod
@@ -141,7 +248,13 @@ class CacheSave:
     def save(self):
         remote_cache_directory = self._prepare()
 
-        local_cache_archive_path = get_local_cache_archive_path(self._cache_directory, self._cache_name)
+        if compression_enabled():
+            local_cache_archive_path = get_local_cache_archive_compressed_path(
+                self._cache_directory, self._cache_name
+            )
+        else:
+            local_cache_archive_path = get_local_cache_archive_path(self._cache_directory, self._cache_name)
+
         self._download(remote_cache_directory, local_cache_archive_path)
 
     def _prepare(self) -> str:
@@ -177,10 +290,12 @@ class CacheSave:
             try:
                 logger.debug(f"Downloading cache folder '{src}' to '{f.name}'")
                 data, _ = self._container.get_archive(src)
-                size = 0
-                for chunk in data:
-                    size += len(chunk)
-                    f.write(chunk)
+                preallocated = preallocate_file(f, get_previous_archive_size(dst))
+                if dst.endswith(ZSTD_ARCHIVE_SUFFIX):
+                    data = compress_chunks(data)
+                size = write_chunks(f, data)
+                if preallocated:
+                    os.ftruncate(f.fileno(), size)
             except Exception as e:
                 logger.error(f"Error getting cache from container: {self._cache_name}: {e}")
                 os.unlink(f.name)
@@ -188,6 +303,7 @@ class CacheSave:
             else:
                 logger.debug(f"Moving temp cache archive {f.name} to {dst}")
                 os.rename(f.name, dst)
+                remove_stale_archive_counterpart(dst)
 
         t = ts() - t
 
@@ -212,14 +328,246 @@ class CacheSaveFactory:
         return cls(container, cache_directory, cache_definitions, cache_name)
 
 
+def compression_enabled() -> bool:
+    """Whether new cache archives should be compressed: opt-in via the config
+    flag and only effective when the optional zstandard dependency is
+    installed. Existing compressed archives stay readable either way."""
+    return config.compress_caches and zstandard is not None
+
+
+class CountingFileStream:
+    """Iterates over a file in fixed-size chunks while accumulating the total
+    size of the data, so it doesn't require a second pass."""
+
+    def __init__(self, fileobj, chunk_size: int = 1 << 20):
+        self._fileobj = fileobj
+        self._chunk_size = chunk_size
+
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in stream_file_chunks(self._fileobj, self._chunk_size):
+            self.size += len(chunk)
+            # The chunks feed requests' chunked transfer encoding, which
+            # chokes on anything but bytes with some urllib3 versions (1.26
+            # encodes non-bytes chunks as utf8), so copy out of the reused
+            # buffer here.
+            yield bytes(chunk)
+
+
+def stream_file_chunks(fileobj, chunk_size: int = 1 << 20):
+    # A single reusable buffer keeps the transfer at one copy from the kernel;
+    # each chunk is fully consumed by the caller before the next read
+    # overwrites it.
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+
+    while True:
+        n = fileobj.readinto(buf)
+        if not n:
+            break
+
+        yield view[:n]
+
+
+def compress_chunks(chunks: Iterable[bytes]) -> Iterable[bytes]:
+    # threads=-1 lets zstd spread the compression over all cores
+    compressor = zstandard.ZstdCompressor(threads=-1).compressobj()
+
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+
+    data = compressor.flush()
+    if data:
+        yield data
+
+
+def remove_stale_archive_counterpart(archive_path: str):
+    """Drop the plain archive when a compressed one was just saved (and vice
+    versa), so a later restore can't pick up an outdated sibling."""
+    if archive_path.endswith(ZSTD_ARCHIVE_SUFFIX):
+        counterpart = archive_path[: -len(ZSTD_ARCHIVE_SUFFIX)]
+    else:
+        counterpart = archive_path + ZSTD_ARCHIVE_SUFFIX
+
+    try:
+        os.unlink(counterpart)
+    except OSError:
+        pass
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for chunk in stream_file_chunks(f, chunk_size):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def get_previous_archive_size(archive_path: str) -> int:
+    """Size of the archive from the previous save of the same cache, used as
+    a preallocation hint: docker doesn't report the length of the tar stream
+    upfront, and cache sizes are stable from one run to the next."""
+    try:
+        return os.stat(archive_path).st_size
+    except OSError:
+        return 0
+
+
+def preallocate_file(fileobj, size: int) -> bool:
+    """Reserve disk space for the file upfront, so the filesystem can allocate
+    contiguous extents instead of growing the file chunk by chunk."""
+    if size <= 0 or not hasattr(os, "posix_fallocate"):
+        return False
+
+    fileobj.flush()
+
+    try:
+        os.posix_fallocate(fileobj.fileno(), 0, size)
+    except OSError as e:
+        logger.debug("Unable to preallocate %s bytes: %s", size, e)
+        return False
+
+    return True
+
+
+def write_chunks(fileobj, chunks: Iterable[bytes]) -> int:
+    ring = _init_io_uring()
+    if ring is not None:
+        return _write_chunks_io_uring(ring, fileobj, chunks)
+
+    if hasattr(os, "writev"):
+        return _write_chunks_vectored(fileobj, chunks)
+
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        fileobj.write(chunk)
+
+    return size
+
+
+def _write_chunks_vectored(fileobj, chunks: Iterable[bytes]) -> int:
+    fileobj.flush()
+    fd = fileobj.fileno()
+
+    size = 0
+    buffers = []
+
+    for chunk in chunks:
+        buffers.append(memoryview(chunk))
+
+        if len(buffers) >= WRITEV_BATCH_SIZE:
+            size += _writev_all(fd, buffers)
+            buffers = []
+
+    if buffers:
+        size += _writev_all(fd, buffers)
+
+    return size
+
+
+def _writev_all(fd: int, buffers: List[memoryview]) -> int:
+    total = 0
+
+    while buffers:
+        written = os.writev(fd, buffers)
+        total += written
+
+        while written:
+            if written >= len(buffers[0]):
+                written -= len(buffers[0])
+                buffers.pop(0)
+            else:
+                buffers[0] = buffers[0][written:]
+                written = 0
+
+    return total
+
+
+def _init_io_uring():
+    """Probe io_uring support before any chunk is consumed: switching backend
+    after data has been written at explicit offsets would corrupt the file, so
+    errors past this point must propagate instead of falling back."""
+    if liburing is None or sys.platform != "linux":
+        return None
+
+    ring = liburing.io_uring()
+
+    try:
+        liburing.io_uring_queue_init(IO_URING_QUEUE_DEPTH, ring)
+    except OSError as e:
+        logger.debug("io_uring unavailable, falling back to vectored writes: %s", e)
+        return None
+
+    return ring
+
+
+def _write_chunks_io_uring(ring, fileobj, chunks: Iterable[bytes]) -> int:
+    fileobj.flush()
+    fd = fileobj.fileno()
+
+    cqe = liburing.io_uring_cqe()
+
+    try:
+        offset = 0
+        pending = []
+
+        for chunk in chunks:
+            chunk_len = len(chunk)
+
+            sqe = liburing.io_uring_get_sqe(ring)
+            liburing.io_uring_prep_write(sqe, fd, chunk, chunk_len, offset)
+            sqe.user_data = chunk_len
+
+            # Keep a reference to the buffer until its completion is reaped
+            pending.append(chunk)
+            offset += chunk_len
+
+            if len(pending) >= IO_URING_BATCH_SIZE:
+                liburing.io_uring_submit(ring)
+                _reap_completions(ring, cqe, pending)
+
+        if pending:
+            liburing.io_uring_submit(ring)
+            _reap_completions(ring, cqe, pending)
+
+        return offset
+    finally:
+        liburing.io_uring_queue_exit(ring)
+
+
+def _reap_completions(ring, cqe, pending: List[bytes]):
+    for _ in range(len(pending)):
+        liburing.io_uring_wait_cqe(ring, cqe)
+        written = liburing.trap_error(cqe.res)
+        if written < cqe.user_data:
+            raise OSError(f"Short io_uring write: {written} < {cqe.user_data}")
+        liburing.io_uring_cqe_seen(ring, cqe)
+
+    pending.clear()
+
+
 def get_local_cache_archive_path(cache_directory: str, cache_name: str) -> str:
     return os.path.join(cache_directory, f"{cache_name}.tar")
 
 
+def get_local_cache_archive_compressed_path(cache_directory: str, cache_name: str) -> str:
+    return get_local_cache_archive_path(cache_directory, cache_name) + ZSTD_ARCHIVE_SUFFIX
+
+
 def get_remote_temp_directory(cache_name: str) -> str:
     return os.path.join(config.caches_dir, cache_name)
 
 
+def get_remote_hash_marker_path(cache_name: str) -> str:
+    return os.path.join(config.caches_dir, f"{cache_name}.sha256")
+
+
 def sanitize_remote_path(path: str) -> str:
     if path.startswith("~"):
         path = path.replace("~", "$HOME", 1)
@@ -7,7 +7,6 @@ from typing import List, Optional
 
 import click
 import pkg_resources
-from pyfzf import FzfPrompt
 
 from . import utils
 from .config import config
@@ -31,6 +30,9 @@ def _prompt_for_pipeline(pipeline_file) -> Optional[str]:
     pipeline = None
     pipelines = _get_pipelines_list(pipeline_file)
 
+    # Imported on demand: pyfzf is only needed for interactive selection
+    from pyfzf import FzfPrompt
+
     try:
         fzf = FzfPrompt()
         pipeline = next(iter(fzf.prompt(pipelines)), None)
@@ -93,7 +95,18 @@ def main(ctx, show_version):
     default=False,
     help="Enable to enforce cpu limits for the runner. Default: False",
 )
-def run(pipeline, repository_path, steps, env_files, color, cpu_limits):
+@click.option(
+    "--reuse-containers/--no-reuse-containers",
+    default=False,
+    help="Enable to reuse step containers across steps and runs. Default: False",
+)
+@click.option(
+    "--lazy-pull/--no-lazy-pull",
+    default=False,
+    help="Enable to skip pulling images that are already present locally. "
+    "Mutable tags may get stale. Default: False",
+)
+def run(pipeline, repository_path, steps, env_files, color, cpu_limits, reuse_containers, lazy_pull):
     """
     Runs the pipeline PIPELINE.
 
@@ -101,6 +114,8 @@ def run(pipeline, repository_path, steps, env_files, color, cpu_limits):
     """
     config.color = color
     config.cpu_limits = cpu_limits
+    config.reuse_containers = reuse_containers
+    config.lazy_pull = lazy_pull
 
     _init_logger()
 
@@ -11,6 +11,12 @@ class Config:
     def __init__(self):
         self.color = True
         self.cpu_limits = False
+        self.partial_clone = True
+        # Off by default: skipping the pull keeps mutable tags (e.g. :latest)
+        # at whatever version is cached locally.
+        self.lazy_pull = False
+        self.reuse_containers = False
+        self.compress_caches = False
 
         # TODO: Move some of these things to default definitions or smth
         self.default_image = "atlassian/default-image:latest"
@@ -1,10 +1,13 @@
+import atexit
 import base64
+import hashlib
 import io
 import logging
 import os.path
 import posixpath
 import sys
 import tarfile
+import threading
 import uuid
 from logging import Logger
 from time import time
@@ -20,6 +23,18 @@ from .models import Image, Pipe
 
 logger = logging.getLogger(__name__)
 
+# Unique per run context and therefore excluded from the reuse fingerprint; a
+# reused container keeps the values baked in by its first run.
+PER_RUN_ENV_VARS = frozenset(
+    {
+        "BITBUCKET_BUILD_NUMBER",
+        "BITBUCKET_PARALLEL_STEP",
+        "BITBUCKET_PARALLEL_STEP_COUNT",
+        "BITBUCKET_PIPELINE_UUID",
+        "BITBUCKET_STEP_UUID",
+    }
+)
+
 
 class ContainerRunner:
     def __init__(
@@ -48,9 +63,11 @@ class ContainerRunner:
         self._container = None
 
     def start(self):
+        if config.reuse_containers and self._reuse_container():
+            return
+
         self._start_container()
-        self._create_pipeline_directories()
-        self._insert_ssh_key_and_config()
+        self._setup_container()
 
     def install_docker_client_if_needed(self, services: Dict[str, Container]):
         if "docker" not in services:
@@ -69,9 +86,65 @@ class ContainerRunner:
         if not self._container:
             return
 
+        if config.reuse_containers:
+            if self._reset_build_directory():
+                logger.info("Returning container to warm pool: %s", self._container.name)
+                _container_pool.release(self._fingerprint(), self._container)
+            else:
+                logger.warning("Unable to reset build directory, removing container: %s", self._container.name)
+                self._container.remove(v=True, force=True)
+
+            self._container = None
+            return
+
         logger.info("Removing container: %s", self._container.name)
         self._container.remove(v=True, force=True)
 
+    def kill(self):
+        if not self._container:
+            return
+
+        logger.info("Killing container: %s", self._container.name)
+        try:
+            self._container.kill()
+        except docker.errors.DockerException as e:
+            logger.warning("Error killing container %s: %s", self._container.name, e)
+
+    def _reuse_container(self) -> bool:
+        container = _container_pool.acquire(self._fingerprint())
+        if not container:
+            return False
+
+        logger.info("Reusing warm container: %s", container.name)
+        self._container = container
+
+        return True
+
+    def _reset_build_directory(self) -> bool:
+        # A pooled container must hand the next step an empty build directory:
+        # git refuses to clone into a non-empty one.
+        exit_code, output = self.run_command(f'rm -rf "{config.build_dir}" && mkdir -p "{config.build_dir}"')
+        if exit_code != 0:
+            logger.warning("Error resetting build directory: %s", output.decode())
+
+        return exit_code == 0
+
+    def _fingerprint(self) -> str:
+        # The network and data volume are named after the step and therefore
+        # unique per step; like PER_RUN_ENV_VARS they say nothing about what
+        # the container can be reused for.
+        environment = sorted((k, str(v)) for k, v in self._environment.items() if k not in PER_RUN_ENV_VARS)
+
+        parts = [
+            self._image.name,
+            str(self._image.run_as_user or 0),
+            str(self._mem_limit),
+            self._repository_path,
+            str(environment),
+        ]
+
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
     def run_script(
         self,
         script: List[Union[str, Pipe]],
@@ -144,7 +217,20 @@ class ContainerRunner:
 
         return self._container.name
 
-    def _create_pipeline_directories(self):
+    def _setup_container(self):
+        # Directory creation and ssh setup are batched into a single exec to
+        # avoid paying the docker exec round-trip twice.
+        setup_cmds = [self._get_create_pipeline_directories_cmd()]
+
+        ssh_setup_cmd = self._get_insert_ssh_key_and_config_cmd()
+        if ssh_setup_cmd:
+            setup_cmds.append(ssh_setup_cmd)
+
+        exit_code, output = self.run_command(" && ".join(setup_cmds), user=0)
+        if exit_code != 0:
+            raise Exception(f"Error setting up container: {output}")
+
+    def _get_create_pipeline_directories_cmd(self) -> str:
         mkdir_cmd = [
             "install",
             "-dD",
@@ -157,17 +243,15 @@ class ContainerRunner:
             config.ssh_key_dir,
         ]
 
-        exit_code, output = self.run_command(mkdir_cmd, user=0)
-        if exit_code != 0:
-            raise Exception(f"Error creating required directories: {output}")
+        return utils.stringify(mkdir_cmd)
 
-    def _insert_ssh_key_and_config(self):
+    def _get_insert_ssh_key_and_config_cmd(self) -> Optional[str]:
         if not self._ssh_private_key:
-            return
+            return None
 
         private_key_file_path = os.path.join(config.ssh_key_dir, "id_rsa")
 
-        cmd = " && ".join(
+        return " && ".join(
             [
                 "install -d -m 700 ~/.ssh",
                 f'echo "IdentityFile {private_key_file_path}\nServerAliveInterval 180" > ~/.ssh/config',
@@ -175,9 +259,6 @@ class ContainerRunner:
                 f'echo "{self._ssh_private_key}" > {private_key_file_path}',
             ]
         )
-        exit_code, output = self.run_command(cmd, user=0)
-        if exit_code != 0:
-            raise Exception(f"Error creating root ssh config: {output}")
 
     def _get_volumes(self):
         return {
@@ -186,6 +267,52 @@ class ContainerRunner:
         }
 
 
+class ContainerPool:
+    """Pool of warm containers that can be reused instead of recreated.
+
+    Everything baked into a container at creation time (image, user, memory
+    limit, environment, workspace) must match for reuse to be sound, so
+    released containers are keyed by a fingerprint of those settings and only
+    handed back on an exact match, regardless of the step that created them.
+    """
+
+    def __init__(self):
+        self._containers = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, fingerprint: str) -> Optional[Container]:
+        while True:
+            with self._lock:
+                entries = self._containers.get(fingerprint)
+                if not entries:
+                    return None
+
+                container = entries.pop()
+
+            try:
+                container.reload()
+            except docker.errors.DockerException:
+                continue
+
+            if container.status != "running":
+                logger.debug("Discarding stale pooled container: %s", container.name)
+                container.remove(v=True, force=True)
+                continue
+
+            return container
+
+    def release(self, fingerprint: str, container: Container):
+        with self._lock:
+            self._containers.setdefault(fingerprint, []).append(container)
+
+    def drain(self) -> List[Container]:
+        with self._lock:
+            entries = list(self._containers.values())
+            self._containers.clear()
+
+        return [container for containers in entries for container in containers]
+
+
 class ContainerScriptRunner:
     def __init__(
         self,
@@ -400,6 +527,45 @@ class ContainerScriptRunnerFactory:
 
 
 _pulled_images = set()
+_container_pool = ContainerPool()
+
+
+def drain_container_pool():
+    """Remove all pooled containers along with their networks and volumes.
+
+    Registered to run at process exit so that pooled containers survive from
+    one pipeline run to the next within the same process.
+    """
+    containers = _container_pool.drain()
+    if not containers:
+        return
+
+    client = docker.from_env()
+
+    for container in containers:
+        logger.info("Removing pooled container: %s", container.name)
+        try:
+            container.remove(v=True, force=True)
+        except docker.errors.DockerException as e:
+            logger.warning("Error removing pooled container %s: %s", container.name, e)
+
+    # The per-step networks and data volumes were left in place for the pooled
+    # containers; with the containers gone they can go as well.
+    for container in containers:
+        for network in client.networks.list(names=[f"{container.name}-network"]):
+            try:
+                network.remove()
+            except docker.errors.DockerException as e:
+                logger.warning("Error removing network %s: %s", network.name, e)
+
+        for volume in client.volumes.list(filters={"name": f"{container.name}-data"}):
+            try:
+                volume.remove()
+            except docker.errors.DockerException as e:
+                logger.warning("Error removing volume %s: %s", volume.name, e)
+
+
+atexit.register(drain_container_pool)
 
 
 def pull_image(client, image):
@@ -409,6 +575,11 @@ def pull_image(client, image):
         logger.info("Image already pulled: %s", image.name)
         return
 
+    if config.lazy_pull and image_exists_locally(client, image):
+        logger.info("Image already present locally, skipping pull: %s", image.name)
+        _pulled_images.add(image.name)
+        return
+
     logger.info("Pulling image: %s", image.name)
 
     auth_config = get_image_authentication(image)
@@ -428,6 +599,15 @@ def pull_image(client, image):
     _pulled_images.add(image.name)
 
 
+def image_exists_locally(client, image) -> bool:
+    try:
+        client.images.get(image.name)
+    except docker.errors.ImageNotFound:
+        return False
+
+    return True
+
+
 def get_image_authentication(image: Image):
     if image.aws:
         aws_access_key_id = image.aws.access_key_id
@@ -3,9 +3,6 @@ import os
 import uuid
 from typing import Dict, List, Optional
 
-from dotenv import dotenv_values
-from slugify import slugify
-
 from . import utils
 from .config import config
 from .models import CloneSettings, Image, Pipeline, ProjectMetadata, Service, Step
@@ -38,9 +35,10 @@ class PipelineRunContext:
         self.project_metadata = project_metadata
         self.repository = repository
         self.env_vars = env_vars or {}
-        self.selected_steps = selected_steps or []
+        # Kept as a frozenset: step runners test membership on every step
+        self.selected_steps = frozenset(selected_steps or ())
 
-        self.pipeline_uuid = uuid.uuid4()
+        self.pipeline_uuid = str(uuid.uuid4())
         self.pipeline_variables = {}
 
         self._data_directory = self.get_pipeline_data_directory()
@@ -79,6 +77,9 @@ class PipelineRunContext:
 
     @staticmethod
     def _load_env_vars(env_files: List[str]) -> Dict[str, str]:
+        # Imported on demand: dotenv is only needed when a context is built
+        from dotenv import dotenv_values
+
         envvars = {}
         # TODO: Load env file in the repo if exists
         logger.debug("Loading .env file (if exists)")
@@ -146,9 +147,9 @@ class StepRunContext:
     ):
         self.step = step
         self.pipeline_ctx = pipeline_run_context
-        self.slug = f"{pipeline_run_context.project_metadata.path_slug}-step-{slugify(step.name)}"
+        self.slug = f"{pipeline_run_context.project_metadata.path_slug}-step-{utils.cached_slugify(step.name)}"
 
-        self.step_uuid = uuid.uuid4()
+        self.step_uuid = str(uuid.uuid4())
 
         if (parallel_step_index is None) != (parallel_step_count is None):
             raise ValueError("`parallel_step_index` and `parallel_step_count` must be both defined or both undefined")
@@ -8,7 +8,6 @@ from git import Repo
 from pydantic import BaseModel as PydanticBaseModel
 from pydantic import Extra, Field, ValidationError, conlist, root_validator, validator
 from pydantic.error_wrappers import ErrorWrapper
-from slugify import slugify
 
 from . import utils
 from .config import config
@@ -119,7 +118,9 @@ class Definitions(BaseModel):
 
 # noinspection PyMethodParameters
 class CloneSettings(BaseModel):
-    depth: Optional[Union[str, int]] = 50
+    # Bitbucket's default depth is 50; the runner only needs the tip of the
+    # branch, and the partial clone fetches missing history lazily anyway.
+    depth: Optional[Union[str, int]] = 1
     lfs: Optional[bool] = False
     enabled: Optional[bool] = True
 
@@ -127,6 +128,10 @@ class CloneSettings(BaseModel):
     def empty(cls):
         return CloneSettings(depth=None, lfs=None, enabled=None)
 
+    @classmethod
+    def default(cls) -> "CloneSettings":
+        return _DEFAULT_CLONE_SETTINGS
+
     @validator("depth")
     def validate_depth(cls, value):
         if value is None:
@@ -146,6 +151,9 @@ class CloneSettings(BaseModel):
         raise TypeError(f"Invalid type for 'depth': {type(value)}")
 
 
+_DEFAULT_CLONE_SETTINGS = CloneSettings.construct()
+
+
 class Trigger(str, Enum):
     Automatic = "automatic"
     Manual = "manual"
@@ -384,7 +392,7 @@ class ProjectMetadata(BaseModel):
             meta = cls.parse_file(fp)
         else:
             name = os.path.basename(project_directory)
-            slug = slugify(name)
+            slug = utils.cached_slugify(name)
             key = "".join(s[0].upper() for s in slug.split("-"))
             meta = cls(name=name, path_slug=path_slug, slug=slug, key=key)
 
@@ -409,7 +417,7 @@ class Repository:
 
 
 class PipelineResult:
-    def __init__(self, exit_code: int, build_number: int, pipeline_uuid: UUID):
+    def __init__(self, exit_code: int, build_number: int, pipeline_uuid: Union[str, UUID]):
         self.exit_code = exit_code
         self.build_number = build_number
         self.pipeline_uuid = pipeline_uuid
@@ -94,6 +94,9 @@ class RepositoryCloner:
         if clone_depth:
             git_clone_cmd += ["--depth", str(clone_depth)]
 
+        if config.partial_clone:
+            git_clone_cmd += ["--filter=blob:none", "--no-tags", "--single-branch"]
+
         git_clone_cmd += [origin, "$BUILD_DIR"]
 
         return " ".join(git_clone_cmd)
@@ -103,7 +106,7 @@ class RepositoryCloner:
             self._first_non_none_value(
                 self._step_clone_settings.enabled,
                 self._global_clone_settings.enabled,
-                CloneSettings.construct().enabled,
+                CloneSettings.default().enabled,
             )
         )
 
@@ -112,7 +115,7 @@ class RepositoryCloner:
             self._first_non_none_value(
                 self._step_clone_settings.lfs,
                 self._global_clone_settings.lfs,
-                CloneSettings.construct().lfs,
+                CloneSettings.default().lfs,
             )
         )
 
@@ -120,7 +123,7 @@ class RepositoryCloner:
         return self._first_non_none_value(
             self._step_clone_settings.depth,
             self._global_clone_settings.depth,
-            CloneSettings.construct().depth,
+            CloneSettings.default().depth,
         )
 
     @staticmethod
@@ -1,6 +1,8 @@
 import logging
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from time import time as ts
 from typing import Dict, List, Optional, Union
 
@@ -115,6 +117,7 @@ class StepRunner:
         self._docker_client = docker.from_env()
         self._services_manager = None
         self._container_runner = None
+        self._cancelled = threading.Event()
 
         self._container_name = self._ctx.slug
         self._data_volume_name = f"{self._container_name}-data"
@@ -127,6 +130,10 @@ class StepRunner:
             logger.info("Skipping step: %s", self._step.name)
             return
 
+        if self._cancelled.is_set():
+            logger.info("Step '%s': Cancelled before start", self._step.name)
+            return
+
         logger.info("Running step: %s", self._step.name)
         logger.debug("Step ID: %s", self._ctx.step_uuid)
 
@@ -198,18 +205,28 @@ class StepRunner:
             if self._container_runner:
                 self._container_runner.stop()
 
-            if network:
+            if network and not config.reuse_containers:
                 network.remove()
 
-            volume = next(iter(self._docker_client.volumes.list(filters={"name": self._data_volume_name})), None)
-            if volume:
-                logger.info("Removing volume: %s", volume.name)
-                volume.remove()
+            if not config.reuse_containers:
+                volume = next(iter(self._docker_client.volumes.list(filters={"name": self._data_volume_name})), None)
+                if volume:
+                    logger.info("Removing volume: %s", volume.name)
+                    volume.remove()
 
         logger.info("Step '%s' executed in %.3fs with exit code: %s", self._step.name, ts() - s, exit_code)
 
         return exit_code
 
+    def terminate(self):
+        """Abort the step as soon as possible: a step that hasn't started yet
+        won't, and a running one has its container killed, which makes the
+        in-flight script exec fail and the normal error path clean up."""
+        self._cancelled.set()
+
+        if self._container_runner:
+            self._container_runner.kill()
+
     def _should_run(self):
         if self._ctx.pipeline_ctx.selected_steps and self._step.name not in self._ctx.pipeline_ctx.selected_steps:
             return False
@@ -226,7 +243,10 @@ class StepRunner:
         return Image(name=config.default_image)
 
     def _create_network(self) -> Network:
-        name = f"{self._ctx.pipeline_ctx.project_metadata.slug}-network"
+        # The name must be unique per step: parallel siblings create their
+        # networks concurrently, and duplicate names make docker refuse to
+        # attach containers to either of them.
+        name = f"{self._container_name}-network"
         network = self._docker_client.networks.create(
             name,
             driver="bridge",
@@ -290,9 +310,27 @@ class StepRunner:
         logger.info("Build setup: '%s'", self._step.name)
         s = ts()
 
-        self._clone_repository()
+        # Caches with a relative target resolve against the build directory, so
+        # only those anchored at an absolute path or the home directory can
+        # safely overlap the clone.
+        cache_definitions = self._ctx.pipeline_ctx.caches
+        overlappable_caches = [
+            name for name in self._step.caches if cache_definitions.get(name, "").startswith(("/", "~"))
+        ]
+        deferred_caches = [name for name in self._step.caches if name not in overlappable_caches]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            clone = executor.submit(self._clone_repository)
+            caches = executor.submit(self._upload_caches, overlappable_caches)
+
+            clone.result()
+            caches.result()
+
+        # Artifacts and build-dir-relative caches are extracted into the build
+        # directory, so they have to wait for the clone: git refuses to clone
+        # into a non-empty directory.
         self._upload_artifacts()
-        self._upload_caches()
+        self._upload_caches(deferred_caches)
 
         if self._ctx.pipeline_ctx.pipeline_variables:
             self._output_logger.info("Pipeline Variables:\n")
@@ -316,11 +354,11 @@ class StepRunner:
         )
         am.upload()
 
-    def _upload_caches(self):
+    def _upload_caches(self, cache_names: List[str]):
         cm = CacheManager(
             self._container_runner, self._ctx.pipeline_ctx.get_cache_directory(), self._ctx.pipeline_ctx.caches
         )
-        cm.upload(self._step.caches)
+        cm.upload(cache_names)
 
     def _clone_repository(self):
         image = self._get_image()
@@ -374,16 +412,28 @@ class ParallelStepRunner:
         self._pipeline_ctx = pipeline_run_context
 
     def run(self) -> Optional[int]:
-        return_code = 0
         step_count = len(self._parallel_step)
 
-        for idx, s in enumerate(self._parallel_step):
-            runner = StepRunnerFactory.get(
-                s, self._pipeline_ctx, parallel_step_index=idx, parallel_step_count=step_count
-            )
-            rc = runner.run()
-            if rc:
-                return_code = rc
+        runners = [
+            StepRunnerFactory.get(s, self._pipeline_ctx, parallel_step_index=idx, parallel_step_count=step_count)
+            for idx, s in enumerate(self._parallel_step)
+        ]
+
+        return_code = 0
+
+        with ThreadPoolExecutor(max_workers=step_count) as executor:
+            futures = {executor.submit(r.run): r for r in runners}
+
+            for future in as_completed(futures):
+                rc = future.result() or 0
+                if rc and not return_code:
+                    return_code = rc
+
+                    # The group is already failed: abort the siblings that are
+                    # still running instead of waiting for them to finish.
+                    for f, runner in futures.items():
+                        if f is not future and not f.done():
+                            runner.terminate()
 
         return return_code
 
@@ -6,10 +6,9 @@ import docker
 from docker import DockerClient
 from docker.models.containers import Container
 from docker.models.volumes import Volume
-from slugify import slugify
 from tenacity import retry, retry_if_exception_type, stop_after_delay, wait_fixed
 
-from . import static
+from . import static, utils
 from .config import config
 from .container import ContainerScriptRunner, pull_image
 from .models import Service
@@ -117,7 +116,7 @@ class ServiceRunner:
         self._pipeline_cache_directory = pipeline_cache_directory
         self._container = None
 
-        self._slug = slugify(self._service_name)
+        self._slug = utils.cached_slugify(self._service_name)
 
     @property
     def slug(self):
@@ -3,18 +3,27 @@ import hashlib
 import logging
 import os
 import sys
+from functools import lru_cache
 from typing import List, Union
 
 from appdirs import user_cache_dir, user_data_dir
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
-from slugify import slugify
 
 from . import APP_NAME
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def cached_slugify(value: str) -> str:
+    """Slugify `value`, memoizing the result: the same step and service names
+    are slugified over and over when building container names."""
+    # Imported on demand: slugify drags in its unicode tables, which is
+    # noticeable on CLI startup.
+    from slugify import slugify
+
+    return slugify(value)
+
+
 def get_output_logger(output_directory: str, name: str) -> logging.Logger:
     formatter = logging.Formatter("%(message)s")
 
@@ -95,7 +104,7 @@ def wrap_in_shell(command: Union[str, List[str]], stop_on_error=True):
 
 
 def hashify_path(path):
-    slug = slugify(os.path.basename(path))
+    slug = cached_slugify(os.path.basename(path))
 
     h = hashlib.sha256(path.encode()).digest()
     h = base64.urlsafe_b64encode(h).decode()[:8]
@@ -104,6 +113,11 @@ def hashify_path(path):
 
 
 def generate_ssh_rsa_key() -> str:
+    # Imported on demand: cryptography is only needed when generating a key
+    # for a new project and is expensive to load.
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
     key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
     private_key = key.private_bytes(
         serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
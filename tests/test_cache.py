@@ -0,0 +1,263 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from pipeline_runner.cache import (
+    CacheManager,
+    CacheRestore,
+    CacheRestoreFactory,
+    CacheSave,
+    CountingFileStream,
+    NullCacheRestore,
+    _writev_all,
+    compress_chunks,
+    file_sha256,
+    get_local_cache_archive_compressed_path,
+    get_local_cache_archive_path,
+    get_previous_archive_size,
+    remove_stale_archive_counterpart,
+    stream_file_chunks,
+    write_chunks,
+)
+
+
+def test_stream_file_chunks_yields_the_whole_file_in_chunk_sized_pieces():
+    data = b"0123456789" * 7
+
+    chunks = [bytes(c) for c in stream_file_chunks(io.BytesIO(data), chunk_size=32)]
+
+    assert b"".join(chunks) == data
+    assert [len(c) for c in chunks] == [32, 32, 6]
+
+
+def test_stream_file_chunks_yields_nothing_for_an_empty_file():
+    assert list(stream_file_chunks(io.BytesIO(b""))) == []
+
+
+def test_counting_file_stream_accumulates_the_size_of_the_data():
+    data = b"some-data" * 100
+
+    stream = CountingFileStream(io.BytesIO(data), chunk_size=64)
+    chunks = list(stream)
+
+    assert b"".join(chunks) == data
+    assert stream.size == len(data)
+
+
+def test_counting_file_stream_yields_bytes():
+    # requests' chunked transfer encoding only accepts bytes with some
+    # urllib3 versions; memoryviews into a reused buffer won't do.
+    stream = CountingFileStream(io.BytesIO(b"some-data" * 100), chunk_size=64)
+
+    assert all(type(c) is bytes for c in stream)
+
+
+def test_write_chunks_writes_all_chunks_and_returns_the_total_size(tmp_path):
+    chunks = [b"a" * 100, b"b" * 50, b"", b"c" * 25]
+    archive = tmp_path / "cache.tar"
+
+    with open(archive, "wb") as f:
+        size = write_chunks(f, iter(chunks))
+
+    assert size == 175
+    assert archive.read_bytes() == b"".join(chunks)
+
+
+def test_writev_all_retries_partial_writes(tmp_path, mocker):
+    real_writev = os.writev
+    mocker.patch("os.writev", side_effect=lambda fd, buffers: real_writev(fd, [buffers[0][:3]]))
+
+    archive = tmp_path / "cache.tar"
+
+    with open(archive, "wb") as f:
+        total = _writev_all(f.fileno(), [memoryview(b"0123456789"), memoryview(b"abcde")])
+
+    assert total == 15
+    assert archive.read_bytes() == b"0123456789abcde"
+
+
+def test_compress_chunks_round_trips():
+    zstandard = pytest.importorskip("zstandard")
+
+    data = b"some fairly repetitive cache content " * 1000
+    chunks = [data[i : i + 256] for i in range(0, len(data), 256)]
+
+    compressed = b"".join(compress_chunks(iter(chunks)))
+
+    assert len(compressed) < len(data)
+    assert zstandard.ZstdDecompressor().decompress(compressed, max_output_size=len(data)) == data
+
+
+def test_file_sha256_matches_the_digest_of_the_file_content(tmp_path):
+    data = b"some-content" * 500
+    archive = tmp_path / "cache.tar"
+    archive.write_bytes(data)
+
+    assert file_sha256(str(archive), chunk_size=128) == hashlib.sha256(data).hexdigest()
+
+
+def test_get_previous_archive_size_returns_zero_for_a_missing_archive(tmp_path):
+    archive = tmp_path / "cache.tar"
+
+    assert get_previous_archive_size(str(archive)) == 0
+
+    archive.write_bytes(b"x" * 42)
+
+    assert get_previous_archive_size(str(archive)) == 42
+
+
+def test_remove_stale_archive_counterpart_drops_the_sibling_archive(tmp_path):
+    plain = get_local_cache_archive_path(str(tmp_path), "pip")
+    compressed = get_local_cache_archive_compressed_path(str(tmp_path), "pip")
+
+    open(plain, "wb").close()
+    open(compressed, "wb").close()
+
+    remove_stale_archive_counterpart(compressed)
+
+    assert not os.path.exists(plain)
+    assert os.path.exists(compressed)
+
+    open(plain, "wb").close()
+    remove_stale_archive_counterpart(plain)
+
+    assert os.path.exists(plain)
+    assert not os.path.exists(compressed)
+
+
+def test_cache_restore_factory_returns_a_null_restore_for_the_docker_cache(mocker):
+    restore = CacheRestoreFactory.get(mocker.Mock(), "/tmp/caches", {"docker": "/var/lib/docker"}, "docker")
+
+    assert isinstance(restore, NullCacheRestore)
+    assert restore.get_prepare_command() is None
+
+
+def test_upload_prepares_all_remote_directories_in_a_single_exec(tmp_path, mocker):
+    container = mocker.Mock()
+    container.run_command.return_value = (0, b"")
+
+    cache_definitions = {"pip": "~/.cache/pip", "poetry": "~/.cache/poetry"}
+
+    for name in cache_definitions:
+        open(get_local_cache_archive_path(str(tmp_path), name), "wb").close()
+
+    manager = CacheManager(container, str(tmp_path), cache_definitions)
+    mocker.patch("pipeline_runner.cache.CacheRestore.restore")
+
+    manager.upload(["pip", "poetry"])
+
+    assert container.run_command.call_count == 1
+    (command,), _ = container.run_command.call_args
+
+    assert command.count("rm -rf") == 2
+    assert command.count("mkdir -p") == 2
+    assert " && " in command
+
+
+def test_upload_does_not_exec_when_no_cache_needs_preparing(tmp_path, mocker):
+    container = mocker.Mock()
+
+    manager = CacheManager(container, str(tmp_path), {"pip": "~/.cache/pip"})
+
+    manager.upload(["pip"])
+
+    assert container.run_command.call_count == 0
+
+
+def test_upload_fails_when_preparing_remote_directories_fails(tmp_path, mocker):
+    container = mocker.Mock()
+    container.run_command.return_value = (1, b"some error")
+
+    open(get_local_cache_archive_path(str(tmp_path), "pip"), "wb").close()
+
+    manager = CacheManager(container, str(tmp_path), {"pip": "~/.cache/pip"})
+
+    with pytest.raises(Exception, match="Error preparing remote cache directories"):
+        manager.upload(["pip"])
+
+
+def test_cache_save_writes_a_plain_tar_archive_by_default(tmp_path, mocker):
+    save = CacheSave(mocker.Mock(), str(tmp_path), {"pip": "~/.cache/pip"}, "pip")
+
+    mocker.patch.object(save, "_prepare", return_value="/remote/dir")
+    download = mocker.patch.object(save, "_download")
+
+    save.save()
+
+    download.assert_called_once_with("/remote/dir", get_local_cache_archive_path(str(tmp_path), "pip"))
+
+
+def test_cache_save_writes_a_compressed_archive_when_enabled(tmp_path, mocker):
+    pytest.importorskip("zstandard")
+    mocker.patch("pipeline_runner.cache.config.compress_caches", True)
+
+    save = CacheSave(mocker.Mock(), str(tmp_path), {"pip": "~/.cache/pip"}, "pip")
+
+    mocker.patch.object(save, "_prepare", return_value="/remote/dir")
+    download = mocker.patch.object(save, "_download")
+
+    save.save()
+
+    download.assert_called_once_with("/remote/dir", get_local_cache_archive_compressed_path(str(tmp_path), "pip"))
+
+
+@pytest.fixture
+def cache_restore(tmp_path, mocker):
+    container = mocker.Mock()
+    container.run_command.return_value = (0, b"")
+    container.put_archive.return_value = True
+
+    archive = get_local_cache_archive_path(str(tmp_path), "pip")
+    with open(archive, "wb") as f:
+        f.write(b"some-cache-content")
+
+    restore = CacheRestore(container, str(tmp_path), {"pip": "~/.cache/pip"}, "pip")
+
+    return restore, container, hashlib.sha256(b"some-cache-content").hexdigest()
+
+
+def test_restore_skips_the_upload_when_the_reused_container_already_has_the_content(cache_restore, mocker):
+    restore, container, cache_hash = cache_restore
+    mocker.patch("pipeline_runner.cache.config.reuse_containers", True)
+
+    container.run_command.return_value = (0, f"{cache_hash}\n".encode())
+
+    restore.restore()
+
+    assert container.put_archive.call_count == 0
+    assert container.run_command.call_count == 1
+    (command,), _ = container.run_command.call_args
+    assert "pip.sha256" in command
+
+
+def test_restore_uploads_and_records_the_hash_when_the_remote_content_differs(cache_restore, mocker):
+    restore, container, cache_hash = cache_restore
+    mocker.patch("pipeline_runner.cache.config.reuse_containers", True)
+
+    container.run_command.side_effect = [
+        (1, b""),  # remote marker check
+        (0, b""),  # restore script
+        (0, b""),  # marker write
+    ]
+
+    restore.restore()
+
+    assert container.put_archive.call_count == 1
+    (command,), _ = container.run_command.call_args
+    assert cache_hash in command
+    assert "pip.sha256" in command
+
+
+def test_restore_does_not_check_the_remote_content_without_container_reuse(cache_restore, mocker):
+    restore, container, _ = cache_restore
+    mocker.patch("pipeline_runner.cache.config.reuse_containers", False)
+
+    restore.restore()
+
+    assert container.put_archive.call_count == 1
+    # The only exec is the restore script: no marker check, no marker write.
+    assert container.run_command.call_count == 1
+    (command,), _ = container.run_command.call_args
+    assert "sha256" not in command
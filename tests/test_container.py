@@ -2,7 +2,7 @@ import base64
 
 import pytest
 
-from pipeline_runner.container import ContainerRunner, get_image_authentication
+from pipeline_runner.container import ContainerPool, ContainerRunner, get_image_authentication
 from pipeline_runner.models import AwsCredentials, Image
 
 
@@ -137,3 +137,120 @@ def test_cpu_limits_are_applied_if_config_is_set_to_true(config, mocker):
     assert kwargs["cpu_period"] == 100_000
     assert kwargs["cpu_quota"] == 400_000
     assert kwargs["cpu_shares"] == 4096
+
+
+def test_container_pool_returns_a_released_container_on_matching_fingerprint(mocker):
+    pool = ContainerPool()
+    container = mocker.Mock(status="running")
+
+    pool.release("fingerprint", container)
+
+    assert pool.acquire("fingerprint") is container
+    assert pool.acquire("fingerprint") is None
+    assert container.remove.call_count == 0
+
+
+def test_container_pool_returns_nothing_on_fingerprint_mismatch(mocker):
+    pool = ContainerPool()
+    container = mocker.Mock(status="running")
+
+    pool.release("fingerprint", container)
+
+    assert pool.acquire("other-fingerprint") is None
+    assert container.remove.call_count == 0
+    assert pool.acquire("fingerprint") is container
+
+
+def test_container_pool_discards_containers_that_are_not_running(mocker):
+    pool = ContainerPool()
+    stopped = mocker.Mock(status="exited")
+    running = mocker.Mock(status="running")
+
+    pool.release("fingerprint", running)
+    pool.release("fingerprint", stopped)
+
+    assert pool.acquire("fingerprint") is running
+    stopped.remove.assert_called_once_with(v=True, force=True)
+
+
+def test_container_pool_drain_empties_the_pool(mocker):
+    pool = ContainerPool()
+    containers = [mocker.Mock(status="running") for _ in range(2)]
+
+    pool.release("fingerprint-a", containers[0])
+    pool.release("fingerprint-b", containers[1])
+
+    assert sorted(pool.drain(), key=id) == sorted(containers, key=id)
+    assert pool.drain() == []
+    assert pool.acquire("fingerprint-a") is None
+
+
+def _make_runner(mocker, name="container", network_name=None, data_volume_name="data-volume", env_vars=None):
+    return ContainerRunner(
+        name=name,
+        image=Image(name="alpine"),
+        network_name=network_name,
+        repository_path="/some/path",
+        data_volume_name=data_volume_name,
+        env_vars=env_vars or {},
+        output_logger=mocker.Mock(),
+    )
+
+
+def test_fingerprint_ignores_per_run_identifiers(mocker):
+    mocker.patch("pipeline_runner.container.docker.from_env")
+
+    base_env = {"BITBUCKET_REPO_SLUG": "my-repo"}
+    first = _make_runner(mocker, env_vars={**base_env, "BITBUCKET_BUILD_NUMBER": 1, "BITBUCKET_STEP_UUID": "uuid-1"})
+    second = _make_runner(mocker, env_vars={**base_env, "BITBUCKET_BUILD_NUMBER": 2, "BITBUCKET_STEP_UUID": "uuid-2"})
+    third = _make_runner(mocker, env_vars={**base_env, "EXTRA_VAR": "value"})
+
+    assert first._fingerprint() == second._fingerprint()
+    assert first._fingerprint() != third._fingerprint()
+
+
+def test_fingerprint_ignores_step_specific_names(mocker):
+    mocker.patch("pipeline_runner.container.docker.from_env")
+
+    first = _make_runner(mocker, name="step-a", network_name="step-a-network", data_volume_name="step-a-data")
+    second = _make_runner(mocker, name="step-b", network_name="step-b-network", data_volume_name="step-b-data")
+
+    assert first._fingerprint() == second._fingerprint()
+
+
+def test_stop_resets_the_build_directory_before_pooling_the_container(config, mocker):
+    mocker.patch("pipeline_runner.container.docker.from_env")
+    pool = mocker.patch("pipeline_runner.container._container_pool")
+
+    config.reuse_containers = True
+    config.build_dir = "/some/build/dir"
+
+    runner = _make_runner(mocker)
+    container = mocker.Mock()
+    container.exec_run.return_value = (0, b"")
+    runner._container = container
+
+    runner.stop()
+
+    (command,), _ = container.exec_run.call_args
+    assert 'rm -rf "/some/build/dir"' in command[-1]
+    pool.release.assert_called_once_with(mocker.ANY, container)
+    assert container.remove.call_count == 0
+
+
+def test_stop_removes_the_container_if_the_build_directory_cannot_be_reset(config, mocker):
+    mocker.patch("pipeline_runner.container.docker.from_env")
+    pool = mocker.patch("pipeline_runner.container._container_pool")
+
+    config.reuse_containers = True
+    config.build_dir = "/some/build/dir"
+
+    runner = _make_runner(mocker)
+    container = mocker.Mock()
+    container.exec_run.return_value = (1, b"some error")
+    runner._container = container
+
+    runner.stop()
+
+    assert pool.release.call_count == 0
+    container.remove.assert_called_once_with(v=True, force=True)
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from pipeline_runner.runner import ParallelStepRunner
+
+
+@pytest.fixture
+def step_runner_factory(mocker):
+    return mocker.patch("pipeline_runner.runner.StepRunnerFactory.get")
+
+
+def _parallel_runner(mocker, runners, step_runner_factory):
+    step_runner_factory.side_effect = runners
+
+    return ParallelStepRunner([mocker.Mock() for _ in runners], mocker.Mock())
+
+
+def test_parallel_step_runner_returns_zero_when_all_steps_succeed(mocker, step_runner_factory):
+    runners = [mocker.Mock(**{"run.return_value": 0}) for _ in range(3)]
+
+    assert _parallel_runner(mocker, runners, step_runner_factory).run() == 0
+
+    for r in runners:
+        assert r.terminate.call_count == 0
+
+
+def test_parallel_step_runner_returns_the_exit_code_of_the_first_failed_step(mocker, step_runner_factory):
+    runners = [mocker.Mock(**{"run.return_value": rc}) for rc in (0, 2)]
+
+    assert _parallel_runner(mocker, runners, step_runner_factory).run() == 2
+
+
+def test_parallel_step_runner_terminates_running_siblings_on_first_failure(mocker, step_runner_factory):
+    release = threading.Event()
+
+    def run_until_terminated():
+        release.wait(timeout=10)
+        return 0
+
+    slow = mocker.Mock()
+    slow.run.side_effect = run_until_terminated
+    slow.terminate.side_effect = release.set
+
+    fast = mocker.Mock(**{"run.return_value": 1})
+
+    assert _parallel_runner(mocker, [fast, slow], step_runner_factory).run() == 1
+
+    slow.terminate.assert_called_once_with()
+    assert fast.terminate.call_count == 0